@@ -1,143 +1,137 @@
 import os
-import shutil
+import io
+import itertools
 import streamlit as st
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException, WebDriverException
-from bs4 import BeautifulSoup
-import pandas as pd
-from fpdf import FPDF
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
 import tempfile
 import logging
 import time
-import subprocess
+import random
 import uuid
 import atexit
 from datetime import datetime, timedelta
 import threading
-from queue import Queue
+import ipaddress
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Function to create temporary file with session ID and better error handling
 def create_temp_file(suffix):
-    temp_dir = tempfile.gettempdir()
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            file_name = f"ignou_grade_{st.session_state.session_id}_{uuid.uuid4()}{suffix}"
-            file_path = os.path.join(temp_dir, file_name)
-            # Create empty file to ensure we have write permissions
-            with open(file_path, 'w') as f:
-                pass
-            st.session_state.temp_files.append(file_path)
-            return file_path
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise
-            time.sleep(0.1)
-
-# Enhanced resource management with better concurrency support
-class ResourceManager:
-    def __init__(self):
-        self.active_drivers = {}
-        self.lock = threading.Lock()
-        self.driver_semaphore = threading.Semaphore(5)  # Limit concurrent drivers
-        self.last_cleanup = time.time()
-        self.cleanup_interval = 300  # 5 minutes
-    
-    def add_driver(self, session_id, driver):
-        with self.lock:
-            # Cleanup old drivers periodically
-            current_time = time.time()
-            if current_time - self.last_cleanup > self.cleanup_interval:
-                self._cleanup_old_drivers()
-                self.last_cleanup = current_time
-            
-            # Acquire semaphore before adding new driver
-            self.driver_semaphore.acquire()
-            self.active_drivers[session_id] = {
-                'driver': driver,
-                'created_at': current_time,
-                'last_used': current_time
-            }
-    
-    def remove_driver(self, session_id):
-        with self.lock:
-            if session_id in self.active_drivers:
-                try:
-                    self.active_drivers[session_id]['driver'].quit()
-                except Exception as e:
-                    logging.error(f"Error closing driver for session {session_id}: {e}")
-                del self.active_drivers[session_id]
-                self.driver_semaphore.release()
-    
-    def _cleanup_old_drivers(self):
-        current_time = time.time()
-        expired_sessions = []
-        for session_id, driver_info in self.active_drivers.items():
-            # Cleanup drivers older than 10 minutes or inactive for 5 minutes
-            if (current_time - driver_info['created_at'] > 600 or 
-                current_time - driver_info['last_used'] > 300):
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
-            self.remove_driver(session_id)
-    
-    def update_last_used(self, session_id):
-        with self.lock:
-            if session_id in self.active_drivers:
-                self.active_drivers[session_id]['last_used'] = time.time()
-    
-    def cleanup_all(self):
-        with self.lock:
-            for session_id in list(self.active_drivers.keys()):
-                self.remove_driver(session_id)
+    # One private directory per session, created on first use; names inside it
+    # come from a counter, so they cannot collide and need no probe file.
+    # TemporaryDirectory removes itself when it is garbage collected, i.e. when
+    # Streamlit discards the session's state, and at the latest at process exit
+    if "temp_dir" not in st.session_state:
+        st.session_state.temp_dir = tempfile.TemporaryDirectory(prefix=f"ignou_grade_{st.session_state.session_id}_")
+        st.session_state.temp_counter = itertools.count()
+    return os.path.join(st.session_state.temp_dir.name, f"{next(st.session_state.temp_counter)}{suffix}")
 
 # Enhanced rate limiting with better concurrency support
 class RateLimiter:
     def __init__(self, max_requests=10, time_window=60):
         self.max_requests = max_requests
         self.time_window = time_window
-        self.requests = []
+        self.requests = deque()
         self.lock = threading.Lock()
     
-    def check_rate_limit(self):
+    def _expire(self, current_time):
+        # Timestamps are appended in order, so expired ones are at the left
+        while self.requests and current_time - self.requests[0] >= self.time_window:
+            self.requests.popleft()
+    
+    def check_rate_limit(self, count=1):
+        """Reserve count requests in the sliding window, all or nothing"""
         with self.lock:
-            current_time = time.time()
-            # Remove old requests
-            self.requests = [req_time for req_time in self.requests 
-                           if current_time - req_time < self.time_window]
+            # Monotonic clock, so wall-clock adjustments cannot shrink or stretch the window
+            current_time = time.monotonic()
+            self._expire(current_time)
             
-            if len(self.requests) >= self.max_requests:
+            if len(self.requests) + count > self.max_requests:
                 return False
             
-            self.requests.append(current_time)
+            self.requests.extend([current_time] * count)
             return True
-
-# Initialize rate limiter
-rate_limiter = RateLimiter(max_requests=10, time_window=60)
-
-# Setup logging with session ID and rotation
-def setup_logging():
+    
+    def retry_after(self, count=1):
+        """Seconds until enough requests leave the window to admit count more"""
+        with self.lock:
+            current_time = time.monotonic()
+            self._expire(current_time)
+            # The request whose expiry frees the last of the count slots needed
+            index = len(self.requests) + count - self.max_requests - 1
+            if index < 0 or not self.requests:
+                return 0
+            index = min(index, len(self.requests) - 1)
+            return max(0, self.time_window - (current_time - self.requests[index]))
+
+# Adaptive cap on concurrent requests to the grade card site (AIMD)
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=8):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        # While the rate limiter is turning users away, run one fetch at a time
+        self.throttled_until = 0.0
+        self.condition = threading.Condition()
+    
+    def _current_limit(self):
+        if time.monotonic() < self.throttled_until:
+            return self.min_limit
+        return int(self.limit)
+    
+    def acquire(self, timeout=None):
+        """Take a fetch slot, returning False if none frees up within timeout"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.in_flight < self._current_limit(), timeout):
+                return False
+            self.in_flight += 1
+            return True
+    
+    def throttle(self, duration):
+        """Hold concurrency at min_limit for the next duration seconds"""
+        with self.condition:
+            self.throttled_until = max(self.throttled_until, time.monotonic() + duration)
+    
+    def release(self, success=None):
+        """Give back a fetch slot; success=None leaves the limit unchanged"""
+        with self.condition:
+            self.in_flight -= 1
+            if success:
+                # Additive increase: roughly one more slot per window of successful requests
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif success is not None:
+                # Multiplicative decrease when the site times out, refuses or throttles us
+                self.limit = max(self.min_limit, self.limit / 2)
+            self.condition.notify_all()
+
+# Build a session ID from the client IP, a timestamp and a random suffix
+def make_session_id():
     # Get client IP address using new query_params
     client_ip = st.query_params.get("client_ip", "unknown")
     if client_ip == "unknown":
-        try:
-            import socket
-            client_ip = socket.gethostbyname(socket.gethostname())
-        except:
-            client_ip = "unknown"
+        # Behind Streamlit's proxy the client is the first X-Forwarded-For hop; resolving
+        # our own hostname was a blocking DNS lookup that only ever found the server
+        forwarded_for = st.context.headers.get("X-Forwarded-For", "")
+        client_ip = forwarded_for.split(",")[0].strip() or "unknown"
+    
+    # Both sources are client supplied and the session ID ends up in temp
+    # directory and download names, so only accept a well-formed address
+    try:
+        client_ip = str(ipaddress.ip_address(client_ip))
+    except ValueError:
+        client_ip = "unknown"
     
     # Create unique session ID using IP and timestamp
     session_id = f"{client_ip}_{int(time.time())}_{str(uuid.uuid4())[:8]}"
-    
-    # Setup minimal logging
-    logging.basicConfig(level=logging.INFO)
     return session_id
 
+# Setup minimal logging; basicConfig does nothing once the root logger has a
+# handler, so later reruns leave the first configuration in place
+logging.basicConfig(level=logging.INFO)
+
 # Initialize Streamlit page config first
 st.set_page_config(
     page_title="IGNOU Grade Card Automation",
@@ -147,20 +141,26 @@ st.set_page_config(
 
 # Initialize session state variables
 if "session_id" not in st.session_state:
-    st.session_state.session_id = setup_logging()
-if "temp_files" not in st.session_state:
-    st.session_state.temp_files = []
+    st.session_state.session_id = make_session_id()
 if "processing" not in st.session_state:
     st.session_state.processing = False
 if "last_request_time" not in st.session_state:
     st.session_state.last_request_time = None
-if "retry_count" not in st.session_state:
-    st.session_state.retry_count = 0
+if "rate_limiter" not in st.session_state:
+    # Each user gets their own lookup budget; the fetch limiter below protects the site
+    st.session_state.rate_limiter = RateLimiter(max_requests=10, time_window=60)
+
+# Streamlit re-executes this script on every interaction, so process-wide
+# objects are built once through st.cache_resource instead of per rerun
+@st.cache_resource(show_spinner=False)
+def get_fetch_limiter():
+    return AdaptiveConcurrencyLimiter()
 
-resource_manager = ResourceManager()
+rate_limiter = st.session_state.rate_limiter
+fetch_limiter = get_fetch_limiter()
 
-# Custom CSS
-st.markdown("""
+# Custom CSS and page title
+PAGE_CSS = """
     <style>
     .main {
         padding: 2rem;
@@ -192,21 +192,31 @@ st.markdown("""
         padding: 1rem;
         border-radius: 0.5rem;
     }
-    .summary-box {
-        background-color: #f0f2f6;
-        padding: 1.5rem;
-        border-radius: 0.5rem;
-        margin: 1rem 0;
-    }
     </style>
-""", unsafe_allow_html=True)
-
-# Title with custom styling
-st.markdown("""
+"""
+PAGE_TITLE_HTML = """
     <h1 style='text-align: center; color: #1E88E5; margin-bottom: 2rem;'>
         🎓 IGNOU Grade Card Calculator
     </h1>
-""", unsafe_allow_html=True)
+"""
+
+# Streamlit drops elements that a rerun does not emit again, so the styles
+# are re-sent on every run - as one element together with the title
+st.markdown(PAGE_CSS + PAGE_TITLE_HTML, unsafe_allow_html=True)
+
+# Input options, frozen once instead of being rebuilt inside the widgets
+GRADECARD_FOR_OPTIONS = {
+    "1": "BCA/MCA/MP/PGDCA etc.",
+    "2": "BDP/BA/B.COM/B.Sc./ASSO Programmes",
+    "3": "CBCS Programmes",
+    "4": "Other Programmes"
+}
+VALID_PROGRAMS = (
+    "BCA", "BCAOL", "BCA_NEW", "BCA_NEWOL", "MBF", "MCA", "MCAOL",
+    "MCA_NEW", "MCA_NEWOL", "MP", "MPB", "PGDCA", "PGDCA_NEW",
+    "PGDHRM", "PGDFM", "PGDOM", "PGDMM", "PGDFMP"
+)
+DEFAULT_PROGRAM_INDEX = VALID_PROGRAMS.index("MCAOL")
 
 # Create two columns for input fields
 col1, col2 = st.columns(2)
@@ -225,674 +235,729 @@ with col1:
     )
     gradecard_for = st.selectbox(
         "Gradecard For",
-        [
-            ("1", "BCA/MCA/MP/PGDCA etc."),
-            ("2", "BDP/BA/B.COM/B.Sc./ASSO Programmes"),
-            ("3", "CBCS Programmes"),
-            ("4", "Other Programmes")
-        ],
-        format_func=lambda x: x[1],
+        tuple(GRADECARD_FOR_OPTIONS),
+        format_func=GRADECARD_FOR_OPTIONS.get,
         index=0,
         help="Select your program category"
     )
 
 with col2:
-    valid_programs = [
-        "BCA", "BCAOL", "BCA_NEW", "BCA_NEWOL", "MBF", "MCA", "MCAOL",
-        "MCA_NEW", "MCA_NEWOL", "MP", "MPB", "PGDCA", "PGDCA_NEW",
-        "PGDHRM", "PGDFM", "PGDOM", "PGDMM", "PGDFMP"
-    ]
     program_code = st.selectbox(
         "Programme Code",
-        valid_programs,
-        index=valid_programs.index("MCAOL"),
+        VALID_PROGRAMS,
+        index=DEFAULT_PROGRAM_INDEX,
         help="Select your program code"
     )
 
-# Function to find Chromium binary
-def find_chromium_binary():
-    possible_paths = [
-        "/usr/bin/chromium",
-        "/usr/bin/chromium-browser",
-        "/usr/lib/chromium-browser/chromium",
-        "/usr/lib/chromium/chromium"
-    ]
-    for path in possible_paths:
-        if os.path.exists(path):
-            logging.info("Found Chromium binary at: %s", path)
-            return path
-    logging.error("No Chromium binary found in paths: %s", possible_paths)
-    return None
+# Enrollment numbers are 9 or 10 digits
+VALID_ENROLLMENT_LENGTHS = frozenset((9, 10))
+
+def is_valid_enrollment(enrollment_number):
+    # The O(1) length gate runs before the isdigit() scan
+    return len(enrollment_number) in VALID_ENROLLMENT_LENGTHS and enrollment_number.isdigit()
 
 # Function to log enrollment number
 def log_enrollment(enrollment_number):
     logging.info(f"Processing enrollment number: {enrollment_number}")
 
 # Extract student details from the page
-def extract_student_details(soup):
+def extract_student_details(first_row):
     try:
-        # Find the student details table
-        details_table = soup.find("table", {"id": "ctl00_ContentPlaceHolder1_gvDetail"})
-        if details_table:
-            # Get the first row which contains student details
-            first_row = details_table.find("tr")
-            if first_row:
-                cells = first_row.find_all("td")
-                if len(cells) >= 3:
-                    return {
-                        "enrollment": cells[0].text.strip(),
-                        "name": cells[1].text.strip(),
-                        "program": cells[2].text.strip()
-                    }
+        # The first row of the grade card table holds the student details
+        cells = first_row.xpath('./td')
+        if len(cells) >= 3:
+            return {
+                "enrollment": cells[0].text_content().strip(),
+                "name": cells[1].text_content().strip(),
+                "program": cells[2].text_content().strip()
+            }
     except Exception as e:
         logging.error(f"Error extracting student details: {str(e)}")
     return None
 
-# Add new helper functions for robust element interaction
-def wait_for_page_load(driver, timeout=30):
-    """Wait for the page to be fully loaded and interactive"""
-    try:
-        # Wait for document ready state
-        WebDriverWait(driver, timeout).until(
-            lambda d: d.execute_script('return document.readyState') == 'complete'
-        )
-        # Additional wait for jQuery if present
-        try:
-            WebDriverWait(driver, 5).until(
-                lambda d: d.execute_script('return jQuery.active == 0')
-            )
-        except:
-            pass  # jQuery not present, continue
-        # Small delay to ensure dynamic content is loaded
-        time.sleep(1)
-    except TimeoutException:
-        logging.warning("Page load timeout - continuing anyway")
-
-def wait_and_find_element(driver, by, value, timeout=10, clickable=False):
-    """Wait for an element to be present and optionally clickable"""
-    try:
-        # First check if element exists in DOM
-        element = WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((by, value))
-        )
-        # Then check if it's visible
-        WebDriverWait(driver, timeout).until(
-            EC.visibility_of_element_located((by, value))
-        )
-        # Finally check if it's clickable if requested
-        if clickable:
-            WebDriverWait(driver, timeout).until(
-                EC.element_to_be_clickable((by, value))
-            )
-        return element
-    except TimeoutException:
-        logging.error(f"Element not found or not ready: {by}={value}")
-        return None
+# Grade card endpoint and browser-like headers for the ASP.NET form
+GRADECARD_URL = "https://gradecard.ignou.ac.in/gradecard/"
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+}
+# (connect, read) timeouts in seconds - an unreachable host fails fast instead of hanging
+REQUEST_TIMEOUT = (5, 20)
+
+def parse_html(response):
+    """Parse a response body into an lxml document, using the header charset if one is declared"""
+    from lxml import html as lxml_html
+    # Without a declared charset requests falls back to ISO-8859-1, so let lxml
+    # sniff the bytes (meta tag / BOM) instead
+    if "charset" not in response.headers.get("Content-Type", "").lower():
+        return lxml_html.document_fromstring(response.content)
+    parser = lxml_html.HTMLParser(encoding=response.encoding)
+    return lxml_html.document_fromstring(response.content, parser=parser)
+
+def extract_hidden_fields(doc):
+    """Collect the ASP.NET hidden inputs (__VIEWSTATE, __EVENTVALIDATION, ...)"""
+    return {
+        field.get("name"): field.get("value", "")
+        for field in doc.xpath('//input[@type="hidden"][@name]')
+    }
 
-def safe_click(driver, element):
-    """Safely click an element using JavaScript if regular click fails"""
-    try:
-        element.click()
-    except ElementNotInteractableException:
-        driver.execute_script("arguments[0].click();", element)
+def get_form_action(doc, base_url):
+    """Resolve the URL the grade card form posts back to"""
+    action = doc.xpath('string(//form/@action)')
+    if action:
+        return urljoin(base_url, action)
+    return base_url
+
+def fetch_gradecard_page(http_session, enrollment_number, gradecard_for_code, program_code, timeout=REQUEST_TIMEOUT):
+    """Submit the grade card form over plain HTTP and return the result response"""
+    response = http_session.get(GRADECARD_URL, timeout=timeout)
+    response.raise_for_status()
+    doc = parse_html(response)
+    if not doc.xpath('//*[@id="ddlGradecardfor"]'):
+        raise requests.RequestException("Grade card page not properly loaded")
+
+    # The programme list depends on the grade card type, which the page
+    # fills in through an AutoPostBack when it is not already present
+    if not doc.xpath('//option[@value=$code]', code=program_code):
+        form_data = extract_hidden_fields(doc)
+        form_data.update({
+            "__EVENTTARGET": "ddlGradecardfor",
+            "__EVENTARGUMENT": "",
+            "ddlGradecardfor": gradecard_for_code
+        })
+        response = http_session.post(get_form_action(doc, response.url), data=form_data, timeout=timeout)
+        response.raise_for_status()
+        doc = parse_html(response)
+
+    login_value = doc.xpath('string(//input[@id="btnlogin"]/@value)')
+    form_data = extract_hidden_fields(doc)
+    form_data.update({
+        "ddlGradecardfor": gradecard_for_code,
+        "ddlProgram": program_code,
+        "txtEnrno": enrollment_number,
+        "btnlogin": login_value or "Submit"
+    })
+    response = http_session.post(get_form_action(doc, response.url), data=form_data, timeout=timeout)
+    response.raise_for_status()
+    return response
+
+# Every request goes to the one grade card host; keep enough idle connections
+# for a full batch on top of concurrent single lookups
+HTTP_POOL_MAXSIZE = 20
+
+# Shared connection pool so TCP/TLS connections are reused across reruns and users
+@st.cache_resource
+def get_http_adapter():
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+    atexit.register(adapter.close)
+    return adapter
+
+def new_http_session(adapter=None):
+    """Create a session with its own cookie jar on top of the shared connection pool.
+
+    Worker threads have no script context for st.cache_resource, so they
+    pass in the adapter resolved on the script thread.
+    """
+    http_session = requests.Session()
+    if adapter is None:
+        adapter = get_http_adapter()
+    http_session.mount("https://", adapter)
+    http_session.mount("http://", adapter)
+    http_session.headers.update(REQUEST_HEADERS)
+    return http_session
+
+# Longest wait honoured from a Retry-After header, so a retry never hangs the page
+MAX_RETRY_AFTER = 30
+
+def retry_delay(attempt, error=None):
+    """Seconds to wait after failed attempt number attempt (1-based).
+
+    Uses the server's Retry-After when the failed response carried one,
+    otherwise exponential backoff (1s, 2s, 4s... capped at 8s) with jitter.
+    """
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(int(retry_after), MAX_RETRY_AFTER)
+    return min(2 ** (attempt - 1), 8) + random.uniform(0, 0.5)
+
+def is_retryable(error):
+    """Whether another attempt could succeed: network failures, throttling and server errors.
+
+    Other HTTP errors (a 404 or 403, say) answer the same way every time.
+    """
+    response = getattr(error, "response", None)
+    return response is None or response.status_code == 429 or response.status_code >= 500
+
+class ServerBusyError(Exception):
+    """Raised when no fetch slot frees up in time"""
+
+class GradeCardError(Exception):
+    """Raised when the site answers but the response holds no usable grade card"""
+    def __init__(self, message, page_content=None):
+        super().__init__(message)
+        self.page_content = page_content
+
+# Seconds to wait for a fetch slot before telling the user the server is busy
+FETCH_SLOT_TIMEOUT = 30
+SERVER_BUSY_MESSAGE = "⚠️ The server is busy with other requests. Please try again in a moment."
+
+PAGE_ELEMENTS_XPATH = (
+    '//*[@id="captcha" or @id="ctl00_ContentPlaceHolder1_lblMsg"'
+    ' or @id="ctl00_ContentPlaceHolder1_gvDetail"]'
+)
 
-def ensure_page_loaded(driver):
-    """Ensure the page is properly loaded before proceeding"""
+def load_gradecard(enrollment_number, program_code, gradecard_for_code, adapter=None):
+    """Fetch and parse a grade card, returning the student details and the results table"""
+    import pandas as pd
+    if not fetch_limiter.acquire(timeout=FETCH_SLOT_TIMEOUT):
+        raise ServerBusyError(enrollment_number)
+    # The session is not closed here as that would also close the shared adapter
+    success = None
     try:
-        # Check if we're on the correct page
-        if "gradecard.ignou.ac.in" not in driver.current_url:
-            driver.get("https://gradecard.ignou.ac.in/gradecard/")
-            wait_for_page_load(driver)
+        response = fetch_gradecard_page(new_http_session(adapter), enrollment_number, gradecard_for_code, program_code)
+        # Scan the raw bytes rather than decoding and lower-casing a str copy of the page
+        captcha_in_page = b"captcha" in response.content.lower()
+        success = not captcha_in_page
+    except requests.RequestException as e:
+        # Retryable errors are the site pushing back, like CAPTCHA pages, so both shrink
+        # the limit; a 403 or 404 is a definite answer and leaves it alone
+        if is_retryable(e):
+            success = False
+        raise
+    finally:
+        fetch_limiter.release(success)
+    doc = parse_html(response)
+
+    # Look up the CAPTCHA box, the error label and the results table in one walk of the page
+    page_elements = {}
+    for element in doc.xpath(PAGE_ELEMENTS_XPATH):
+        page_elements.setdefault((element.tag, element.get("id")), element)
+
+    # Check for CAPTCHA
+    if ("div", "captcha") in page_elements or captcha_in_page:
+        raise GradeCardError(
+            "❌ CAPTCHA detected. Please try again later or access the website manually to verify.",
+            response.content
+        )
+
+    # Check for error messages
+    error_label = page_elements.get(("span", "ctl00_ContentPlaceHolder1_lblMsg"))
+    error_message = error_label.text_content().strip() if error_label is not None else ""
+    if error_message:
+        raise GradeCardError(f"❌ IGNOU website error: {error_message}", response.content)
+
+    # Extract table and student details
+    table = page_elements.get(("table", "ctl00_ContentPlaceHolder1_gvDetail"))
+    if table is None:
+        raise GradeCardError("❌ Grade card table not found. Please check your enrollment number and program code.")
+
+    # Everything below only walks the rows of the results table, not the whole page
+    table_rows = table.xpath('.//tr')
+    student_details = extract_student_details(table_rows[0]) if table_rows else None
+
+    headers = [th.text_content().strip() for th in table.xpath('.//th')]
+    num_columns = len(headers)
+    rows = []
+    for tr in table_rows[1:]:
+        cols = [td.text_content().strip() for td in tr.iterchildren('td')]
+        if len(cols) == num_columns:
+            rows.append(cols)
+
+    if not rows:
+        raise GradeCardError("❌ No valid data found in the grade card table.")
+
+    return student_details, pd.DataFrame(rows, columns=headers)
+
+@st.cache_data(ttl=3600, show_spinner="Fetching grade card…", max_entries=128)
+def fetch_gradecard(enrollment_number, program_code, gradecard_for_code):
+    """Cached load_gradecard() for the interactive lookup"""
+    return load_gradecard(enrollment_number, program_code, gradecard_for_code)
+
+def fetch_gradecards(enrollment_numbers, program_code, gradecard_for_code):
+    """Fetch several grade cards concurrently, mapping each enrollment to its result or exception"""
+    # Each fetch is network bound, so threads overlap the round trips on the shared pool;
+    # the fetch limiter alone decides how many actually run at once
+    max_workers = min(len(enrollment_numbers), fetch_limiter.max_limit) or 1
+    results = {}
+    # Resolve the cached adapter here, on the script thread, rather than in the workers
+    adapter = get_http_adapter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(load_gradecard, enrollment_number, program_code, gradecard_for_code, adapter): enrollment_number
+            for enrollment_number in enrollment_numbers
+        }
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+    return results
+
+# Mark columns read from the grade card and the score columns derived from them
+MARK_COLUMNS = ["Asgn1", "TERM END THEORY", "TERM END PRACTICAL"]
+SCORE_COLUMNS = MARK_COLUMNS + ["30% Assignments", "70% Theory", "Total (A+B)"]
+
+# Column settings for the results tables; pure metadata, so built once at import
+COMPLETED_COLUMN_CONFIG = {
+    "COURSE": st.column_config.TextColumn(
+        "Course",
+        width="medium",
+        help="Course Code"
+    ),
+    "Asgn1": st.column_config.NumberColumn(
+        "Assignment",
+        width="small",
+        format="%.0f",
+        help="Assignment Marks"
+    ),
+    "TERM END THEORY": st.column_config.NumberColumn(
+        "Theory",
+        width="small",
+        format="%.0f",
+        help="Theory Marks"
+    ),
+    "TERM END PRACTICAL": st.column_config.NumberColumn(
+        "Practical",
+        width="small",
+        format="%.0f",
+        help="Practical Marks"
+    ),
+    "30% Assignments": st.column_config.NumberColumn(
+        "30% Assignment",
+        width="small",
+        format="%.2f",
+        help="30% of Assignment Marks"
+    ),
+    "70% Theory": st.column_config.NumberColumn(
+        "70% Theory/Practical",
+        width="small",
+        format="%.2f",
+        help="70% of Theory/Practical Marks"
+    ),
+    "Total (A+B)": st.column_config.NumberColumn(
+        "Total",
+        width="small",
+        format="%.2f",
+        help="Total Marks"
+    )
+}
+
+INCOMPLETE_COLUMN_CONFIG = {
+    "COURSE": st.column_config.TextColumn(
+        "Course",
+        width="medium",
+        help="Course Code"
+    ),
+    "STATUS": st.column_config.TextColumn(
+        "Status",
+        width="small",
+        help="Course Status"
+    ),
+    "Asgn1": st.column_config.NumberColumn(
+        "Assignment",
+        width="small",
+        format="%.0f",
+        help="Assignment Marks"
+    ),
+    "TERM END THEORY": st.column_config.NumberColumn(
+        "Theory",
+        width="small",
+        format="%.0f",
+        help="Theory Marks"
+    ),
+    "TERM END PRACTICAL": st.column_config.NumberColumn(
+        "Practical",
+        width="small",
+        format="%.0f",
+        help="Practical Marks"
+    )
+}
+
+def calculate_scores(df):
+    """Weight completed courses 30% assignment / 70% term end exam.
+
+    Converts the mark columns of df in place and returns the completed
+    course table, the totals row, the total possible marks and the
+    final percentage.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Placeholders such as "-", "N/A" or "" coerce to NaN and become 0
+    df[MARK_COLUMNS] = df.reindex(columns=MARK_COLUMNS).apply(pd.to_numeric, errors='coerce').fillna(0)
+
+    # Filter completed courses and exclude non-MCSL lab courses
+    course = df["COURSE"].astype("string")
+    is_mcsl = course.str.startswith("MCSL", na=False).to_numpy(dtype=bool)
+    is_lab = course.str.contains("lab", case=False, regex=False, na=False).to_numpy(dtype=bool)
+    keep = (df["STATUS"] == "COMPLETED").to_numpy() & (is_mcsl | ~is_lab)
+    df_calc = df[keep].copy()
+    is_mcsl = is_mcsl[keep]
+
+    # Calculate scores (MCSL lab courses are weighted on the practical exam)
+    assignment_scores = df_calc["Asgn1"].to_numpy() * 0.3
+    exam_scores = np.where(
+        is_mcsl,
+        df_calc["TERM END PRACTICAL"].to_numpy(),
+        df_calc["TERM END THEORY"].to_numpy()
+    ) * 0.7
+    df_calc["30% Assignments"] = assignment_scores
+    df_calc["70% Theory"] = exam_scores
+    df_calc["Total (A+B)"] = assignment_scores + exam_scores
+
+    # Calculate totals
+    column_sums = df_calc[SCORE_COLUMNS].sum()
+    totals = {"COURSE": "Total", **column_sums.to_dict()}
+
+    # Calculate total possible marks and percentage
+    total_possible_marks = len(df_calc) * 100
+    total_obtained_marks = totals["Total (A+B)"]
+    percentage = round((total_obtained_marks / total_possible_marks) * 100, 2) if total_possible_marks > 0 else 0
+    return df_calc, totals, total_possible_marks, percentage
+
+# PDF table layouts: header labels and column widths in mm
+COMPLETED_PDF_HEADERS = ("S.No.", "Course", "Assignment", "Theory", "Practical", "30% Assignment", "70% Theory", "Total")
+COMPLETED_PDF_COL_WIDTHS = (10, 35, 20, 20, 20, 25, 25, 20)
+INCOMPLETE_PDF_HEADERS = ("S.No.", "Course", "Status", "Assignment", "Theory", "Practical")
+INCOMPLETE_PDF_COL_WIDTHS = (10, 45, 25, 25, 25, 25)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_pdf_report(student_details, totals, percentage, total_possible_marks, df_calc_display, df_incomplete):
+    """Render the grade report PDF and return its bytes"""
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 14)
+    pdf.cell(200, 10, "IGNOU Grade Report", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(10)
+    
+    # Add student details section
+    if student_details:
+        pdf.set_font("helvetica", "B", 12)
+        pdf.cell(200, 10, "Student Details", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("helvetica", size=12)
+        pdf.cell(200, 10, f"Enrollment No: {student_details['enrollment']}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(200, 10, f"Name: {student_details['name']}", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(200, 10, f"Programme Code: {student_details['program']}", new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(10)
+
+    # Add summary section
+    pdf.set_font("helvetica", "B", 12)
+    pdf.cell(200, 10, "Summary", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("helvetica", size=12)
+    pdf.cell(200, 10, f"Final Percentage: {percentage}%", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, f"Total Obtained Marks: {totals['Total (A+B)']:.2f} / {total_possible_marks:.0f}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, f"Total Assignment Marks: {totals['Asgn1']:.0f}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, f"Total Theory Marks: {totals['TERM END THEORY']:.0f}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, f"Total Practical Marks: {totals['TERM END PRACTICAL']:.0f}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(10)
+    
+    # Add completed subjects table
+    pdf.set_font("helvetica", "B", 12)
+    pdf.cell(200, 10, "Completed Subjects", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("helvetica", size=10)
+    
+    # Table headers with serial number
+    col_widths = COMPLETED_PDF_COL_WIDTHS
+    for width, header in zip(col_widths, COMPLETED_PDF_HEADERS):
+        pdf.cell(width, 10, header, 1)
+    pdf.ln()
+    
+    # Add data rows with serial numbers
+    completed_rows = zip(
+        df_calc_display["COURSE"].tolist(),
+        df_calc_display["Asgn1"].tolist(),
+        df_calc_display["TERM END THEORY"].tolist(),
+        df_calc_display["TERM END PRACTICAL"].tolist(),
+        df_calc_display["30% Assignments"].tolist(),
+        df_calc_display["70% Theory"].tolist(),
+        df_calc_display["Total (A+B)"].tolist()
+    )
+    for idx, (course, asgn, theory, practical, asgn_30, theory_70, total) in enumerate(completed_rows, 1):
+        row_cells = (
+            str(idx), course, f"{asgn:.0f}", f"{theory:.0f}", f"{practical:.0f}",
+            f"{asgn_30:.2f}", f"{theory_70:.2f}", f"{total:.2f}"
+        )
+        for width, text in zip(col_widths, row_cells):
+            pdf.cell(width, 10, text, 1)
+        pdf.ln()
+    
+    # Add incomplete subjects if any
+    if not df_incomplete.empty:
+        pdf.ln(10)
+        pdf.set_font("helvetica", "B", 12)
+        pdf.cell(200, 10, "Incomplete Subjects", new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font("helvetica", size=10)
         
-        # Wait for any loading indicators to disappear
-        try:
-            WebDriverWait(driver, 5).until_not(
-                EC.presence_of_element_located((By.CLASS_NAME, "loading"))
-            )
-        except:
-            pass  # No loading indicator found, continue
+        # Table headers for incomplete subjects with serial number
+        col_widths = INCOMPLETE_PDF_COL_WIDTHS
+        for width, header in zip(col_widths, INCOMPLETE_PDF_HEADERS):
+            pdf.cell(width, 10, header, 1)
+        pdf.ln()
         
-        # Verify page title or some key element
-        if not driver.find_elements(By.ID, "ddlGradecardfor"):
-            raise WebDriverException("Grade card page not properly loaded")
-            
-    except Exception as e:
-        logging.error(f"Page load verification failed: {str(e)}")
-        raise WebDriverException("Failed to load grade card page properly")
+        # Add data rows with serial numbers
+        incomplete_rows = zip(
+            df_incomplete["COURSE"].tolist(),
+            df_incomplete["STATUS"].tolist(),
+            df_incomplete["Asgn1"].tolist(),
+            df_incomplete["TERM END THEORY"].tolist(),
+            df_incomplete["TERM END PRACTICAL"].tolist()
+        )
+        for idx, (course, status, asgn, theory, practical) in enumerate(incomplete_rows, 1):
+            row_cells = (
+                str(idx), course, status,
+                f"{asgn:.0f}", f"{theory:.0f}", f"{practical:.0f}"
+            )
+            for width, text in zip(col_widths, row_cells):
+                pdf.cell(width, 10, text, 1)
+            pdf.ln()
+    
+    # fpdf2 renders straight to memory, no temp file round-trip needed
+    return bytes(pdf.output())
 
 # Update the main processing block
 if st.button("🚀 Fetch Grade Card", disabled=st.session_state.processing or not enrollment):
-    if not rate_limiter.check_rate_limit():
-        st.error("⚠️ Too many requests. Please wait a minute before trying again.")
+    # Validate enrollment number before it uses up a rate limit slot
+    if not is_valid_enrollment(enrollment):
+        st.error("❌ Enrollment number must be 9 or 10 digits.")
         st.stop()
     
-    st.session_state.processing = True
-    driver = None
-    max_retries = 2
-    retry_count = 0
-
-    while retry_count <= max_retries:
-        try:
-            # Validate enrollment number
-            if not enrollment.isdigit() or len(enrollment) not in [9, 10]:
-                st.error("❌ Enrollment number must be 9 or 10 digits.")
-                st.session_state.processing = False
-                st.stop()
-
-            logging.info(f"Session {st.session_state.session_id} - Starting grade card fetch for enrollment: {enrollment} (Attempt {retry_count + 1}/{max_retries + 1})")
-
-            # Setup Selenium with optimized options
-            chrome_options = Options()
-            chrome_options.add_argument("--headless=new")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            chrome_options.add_argument("--disable-extensions")
-            chrome_options.add_argument("--disable-notifications")
-            chrome_options.add_argument("--disable-popup-blocking")
-            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-            chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-            
-            # Add unique user data directory for each session
-            user_data_dir = f"/tmp/chrome_profile_{st.session_state.session_id}"
-            chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
-            chrome_options.add_argument("--profile-directory=Default")
-
-            # Find Chromium binary
-            binary_path = find_chromium_binary()
-            if not binary_path:
-                raise WebDriverException("No Chromium binary found. Please ensure chromium is installed.")
-            chrome_options.binary_location = binary_path
-
-            # Use system ChromeDriver if available
-            chromedriver_path = "/usr/bin/chromedriver"
-            if os.path.exists(chromedriver_path):
-                service = Service(chromedriver_path)
-                logging.info(f"Session {st.session_state.session_id} - Using system ChromeDriver at: {chromedriver_path}")
-            else:
-                from webdriver_manager.chrome import ChromeDriverManager
-                service = Service(ChromeDriverManager().install())
-                logging.info(f"Session {st.session_state.session_id} - Using webdriver-manager to install ChromeDriver")
-
-            logging.info(f"Session {st.session_state.session_id} - Initializing ChromeDriver")
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            resource_manager.add_driver(st.session_state.session_id, driver)
-            wait = WebDriverWait(driver, 60)  # Increased timeout to 60s
-
-            # Log Chrome and ChromeDriver versions
-            chrome_version = driver.capabilities['browserVersion']
-            chromedriver_version = driver.capabilities['chrome']['chromedriverVersion'].split(' ')[0]
-            logging.info(f"Session {st.session_state.session_id} - Using Chromium version: {chrome_version}, ChromeDriver version: {chromedriver_version}")
-
-            # Ensure page is properly loaded with session-specific handling
-            ensure_page_loaded(driver)
-            resource_manager.update_last_used(st.session_state.session_id)
-            
-            # Wait for form elements with better error handling
-            gradecard_select = wait_and_find_element(driver, By.ID, "ddlGradecardfor", timeout=15)
-            if not gradecard_select:
-                raise WebDriverException("Grade card type dropdown not found or not ready")
-            Select(gradecard_select).select_by_value(gradecard_for[0])
-
-            time.sleep(1)  # Increased delay for dropdown to update
-
-            program_select = wait_and_find_element(driver, By.ID, "ddlProgram", timeout=15)
-            if not program_select:
-                raise WebDriverException("Program dropdown not found or not ready")
-            Select(program_select).select_by_value(program_code)
-
-            time.sleep(1)  # Increased delay for dropdown to update
-
-            enrollment_input = wait_and_find_element(driver, By.ID, "txtEnrno", timeout=15)
-            if not enrollment_input:
-                raise WebDriverException("Enrollment number input not found or not ready")
-            enrollment_input.clear()
-            enrollment_input.send_keys(enrollment)
+    if not rate_limiter.check_rate_limit():
+        fetch_limiter.throttle(60)
+        st.error(f"⚠️ Too many requests. Please wait {rate_limiter.retry_after():.0f} seconds before trying again.")
+        st.stop()
 
-            time.sleep(1)  # Increased delay before clicking
+    student_details, df = None, None
+    max_retries = 2
 
-            # Optimized login button click
-            login_button = wait_and_find_element(driver, By.ID, "btnlogin", timeout=15, clickable=True)
-            if not login_button:
-                raise WebDriverException("Login button not found or not ready")
-            
-            # Try multiple click methods
-            try:
-                login_button.click()
-            except:
-                try:
-                    driver.execute_script("arguments[0].click();", login_button)
-                except:
-                    # Last resort: try JavaScript event
-                    driver.execute_script("""
-                        var evt = new MouseEvent('click', {
-                            bubbles: true,
-                            cancelable: true,
-                            view: window
-                        });
-                        arguments[0].dispatchEvent(evt);
-                    """, login_button)
-
-            # Wait for results with better error handling
+    # Only the network round trip is retried
+    st.session_state.processing = True
+    try:
+        for attempt in range(1, max_retries + 2):
             try:
-                WebDriverWait(driver, 30).until(
-                    EC.any_of(
-                        EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder1_gvDetail")),
-                        EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder1_lblMsg"))
-                    )
-                )
-            except TimeoutException:
-                raise WebDriverException("Timeout waiting for results or error message")
-
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            logging.info(f"Session {st.session_state.session_id} - Parsed page source")
-
-            # Check for CAPTCHA
-            if soup.find("div", {"id": "captcha"}) or "captcha" in driver.page_source.lower():
-                st.error("❌ CAPTCHA detected. Please try again later or access the website manually to verify.")
-                with create_temp_file('.html') as tmp_file:
-                    tmp_file.write(driver.page_source.encode("utf-8"))
+                logging.info(f"Session {st.session_state.session_id} - Starting grade card fetch for enrollment: {enrollment} (Attempt {attempt}/{max_retries + 1})")
+                student_details, df = fetch_gradecard(enrollment, program_code, gradecard_for)
+                logging.info(f"Session {st.session_state.session_id} - Parsed page source")
+                break
+            except GradeCardError as e:
+                st.error(str(e))
+                # Page dumps are only useful when debugging, so skip the disk write otherwise
+                if e.page_content and logging.getLogger().isEnabledFor(logging.DEBUG):
+                    tmp_file = create_temp_file('.html')
+                    with open(tmp_file, 'wb') as f:
+                        f.write(e.page_content)
                     logging.info(f"Session {st.session_state.session_id} - Page source saved to: {tmp_file}")
                     st.write(f"Page source saved to: {tmp_file}")
-                st.session_state.processing = False
-                st.stop()
-
-            # Check for error messages
-            error_message = soup.find("span", {"id": "ctl00_ContentPlaceHolder1_lblMsg"})
-            if error_message and error_message.text.strip():
-                st.error(f"❌ IGNOU website error: {error_message.text.strip()}")
-                with create_temp_file('.html') as tmp_file:
-                    tmp_file.write(driver.page_source.encode("utf-8"))
-                    logging.info(f"Session {st.session_state.session_id} - Page source saved to: {tmp_file}")
-                    st.write(f"Page source saved to: {tmp_file}")
-                st.session_state.processing = False
-                st.stop()
-
-            # Extract table and student details
-            table = soup.find("table", {"id": "ctl00_ContentPlaceHolder1_gvDetail"})
-            if not table:
-                st.error("❌ Grade card table not found. Please check your enrollment number and program code.")
-                st.session_state.processing = False
-                st.stop()
+                break
+            except ServerBusyError:
+                st.error(SERVER_BUSY_MESSAGE)
+                break
+            except requests.RequestException as e:
+                logging.error(f"Session {st.session_state.session_id} - Attempt {attempt} failed due to network issue: {str(e)}")
+                if not is_retryable(e):
+                    st.error("❌ The IGNOU grade card site rejected the request. Please try again later.")
+                    break
+                if attempt > max_retries:
+                    st.error(f"⏳ Failed to reach the IGNOU grade card site after {max_retries + 1} attempts. Please try again later.")
+                else:
+                    delay = retry_delay(attempt, e)
+                    st.warning(f"⚠️ Attempt {attempt} failed. Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+            except Exception as e:
+                logging.error(f"Session {st.session_state.session_id} - Error: {str(e)}")
+                st.error("❌ An error occurred. Please try again later.")
+                break
+    finally:
+        st.session_state.processing = False
 
-            # Extract student details
-            student_details = extract_student_details(soup)
-            
-            # Display student details in a nice box
+    if df is not None:
+        try:
+            # Display student details in a bordered box
             if student_details:
-                st.markdown('<div class="summary-box">', unsafe_allow_html=True)
-                st.subheader("👤 Student Details")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.write(f"**Enrollment No:** {student_details['enrollment']}")
-                with col2:
-                    st.write(f"**Name:** {student_details['name']}")
-                with col3:
-                    st.write(f"**Programme Code:** {student_details['program']}")
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            headers = [th.text.strip() for th in table.find_all("th")]
-            rows = []
-            for tr in table.find_all("tr")[1:]:
-                cols = [td.text.strip() for td in tr.find_all("td")]
-                if len(cols) == len(headers):
-                    rows.append(cols)
-
-            if not rows:
-                st.error("❌ No valid data found in the grade card table.")
-                st.session_state.processing = False
-                st.stop()
-
-            df = pd.DataFrame(rows, columns=headers)
+                with st.container(border=True):
+                    st.subheader("👤 Student Details")
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        st.write(f"**Enrollment No:** {student_details['enrollment']}")
+                    with col2:
+                        st.write(f"**Name:** {student_details['name']}")
+                    with col3:
+                        st.write(f"**Programme Code:** {student_details['program']}")
 
             # Ensure COURSE column is string type and clean it
             if "COURSE" in df.columns:
                 df["COURSE"] = df["COURSE"].astype(str).fillna("")
             else:
                 st.error("❌ COURSE column missing in grade card table.")
-                st.session_state.processing = False
                 st.stop()
 
-            # Convert columns to numeric
-            for col in ["Asgn1", "TERM END THEORY", "TERM END PRACTICAL"]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col].replace(["-", "N/A", ""], 0), errors='coerce').fillna(0)
-                else:
+            # Convert columns to numeric and calculate scores
+            for col in MARK_COLUMNS:
+                if col not in df.columns:
                     st.warning(f"⚠️ Column {col} missing; assuming 0 for all rows.")
-                    df[col] = 0
-
-            # Filter completed courses and exclude non-MCSL lab courses
-            df_calc = df[df["STATUS"] == "COMPLETED"].copy()
-            df_calc = df_calc[df_calc["COURSE"].str.startswith("MCSL") | ~df_calc["COURSE"].str.contains("lab", case=False, na=False)]
-
-            # Calculate scores
-            df_calc["30% Assignments"] = df_calc["Asgn1"] * 0.3
-            df_calc["70% Theory"] = df_calc.apply(
-                lambda row: row["TERM END PRACTICAL"] * 0.7 if row["COURSE"].startswith("MCSL") else row["TERM END THEORY"] * 0.7, axis=1
-            )
-            df_calc["Total (A+B)"] = df_calc["30% Assignments"] + df_calc["70% Theory"]
-
-            # Calculate totals
-            totals = {
-                "COURSE": "Total",
-                "Asgn1": df_calc["Asgn1"].sum(),
-                "TERM END THEORY": df_calc["TERM END THEORY"].sum(),
-                "TERM END PRACTICAL": df_calc["TERM END PRACTICAL"].sum(),
-                "30% Assignments": df_calc["30% Assignments"].sum(),
-                "70% Theory": df_calc["70% Theory"].sum(),
-                "Total (A+B)": df_calc["Total (A+B)"].sum()
-            }
-
-            # Calculate total possible marks and percentage
-            num_subjects = len(df_calc)
-            total_possible_marks = num_subjects * 100
-            total_obtained_marks = df_calc["Total (A+B)"].sum()
-            percentage = round((total_obtained_marks / total_possible_marks) * 100, 2) if total_possible_marks > 0 else 0
+            df_calc, totals, total_possible_marks, percentage = calculate_scores(df)
+            total_obtained_marks = totals["Total (A+B)"]
 
             # Prepare display DataFrame with totals
-            df_calc_display = pd.concat([df_calc, pd.DataFrame([totals])], ignore_index=True)
+            df_calc_display = df_calc.reset_index(drop=True)
+            df_calc_display.loc[len(df_calc_display)] = totals  # Append the totals row in place
             df_calc_display.index = df_calc_display.index + 1  # Start serial number from 1
 
-            # Filter incomplete subjects
-            df_incomplete = df[df["STATUS"] != "COMPLETED"].copy()
-            # Remove the total row if it exists in incomplete subjects
-            df_incomplete = df_incomplete[df_incomplete["COURSE"] != "Total"]
+            # Filter incomplete subjects once for both the PDF and the on-screen table,
+            # leaving out a total row if one exists
+            incomplete_mask = (df["STATUS"].to_numpy() != "COMPLETED") & (df["COURSE"].to_numpy() != "Total")
+            df_incomplete = df[incomplete_mask]
 
             # Display results with improved layout
             st.success("✅ Grade Card Parsed and Calculated!")
             
-            # Summary section in a nice box with dynamic height
-            st.markdown('<div class="summary-box" style="min-height: fit-content;">', unsafe_allow_html=True)
-            st.subheader("📊 Summary")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Final Percentage", f"{percentage}%")
-                st.write(f"**Total Obtained Marks**: {total_obtained_marks:.2f} / {total_possible_marks:.0f}")
-            with col2:
-                st.write(f"**Total Assignment Marks**: {totals['Asgn1']:.0f}")
-                st.write(f"**Total Theory Marks**: {totals['TERM END THEORY']:.0f}")
-                st.write(f"**Total Practical Marks**: {totals['TERM END PRACTICAL']:.0f}")
-            st.markdown('</div>', unsafe_allow_html=True)
+            # Summary section in a bordered box
+            with st.container(border=True):
+                st.subheader("📊 Summary")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("Final Percentage", f"{percentage}%")
+                    st.markdown(f"**Total Obtained Marks**: {total_obtained_marks:.2f} / {total_possible_marks:.0f}")
+                with col2:
+                    # One element for the three totals instead of a delta per line
+                    st.markdown(
+                        f"**Total Assignment Marks**: {totals['Asgn1']:.0f}\n\n"
+                        f"**Total Theory Marks**: {totals['TERM END THEORY']:.0f}\n\n"
+                        f"**Total Practical Marks**: {totals['TERM END PRACTICAL']:.0f}"
+                    )
 
             # Download buttons in a row
             col1, col2 = st.columns(2)
             
             with col1:
-                # Excel download for completed subjects
-                excel_file = create_temp_file('.xlsx')
+                # Excel download for completed subjects, built in memory like the PDF
                 try:
-                    with pd.ExcelWriter(excel_file, engine='xlsxwriter') as excel_buffer:
-                        df_calc_display.to_excel(excel_buffer, sheet_name='Completed Subjects', index=False)
-                        if not df_calc.empty:
-                            df_calc.to_excel(excel_buffer, sheet_name='Completed Subjects', index=False)
+                    import pandas as pd
+                    excel_buffer = io.BytesIO()
+                    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as excel_writer:
+                        df_calc_display.to_excel(excel_writer, sheet_name='Completed Subjects', index=False)
+                        if not df_incomplete.empty:
+                            df_incomplete.to_excel(excel_writer, sheet_name='Incomplete Subjects', index=False)
                     
-                    with open(excel_file, 'rb') as f:
-                        st.download_button(
-                            "📊 Download Excel Report",
-                            f,
-                            file_name=f"ignou_grade_report_{st.session_state.session_id}.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            use_container_width=True
-                        )
+                    st.download_button(
+                        "📊 Download Excel Report",
+                        excel_buffer.getvalue(),
+                        file_name=f"ignou_grade_report_{st.session_state.session_id}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        use_container_width=True
+                    )
                 except Exception as e:
                     logging.error(f"Session {st.session_state.session_id} - Error creating Excel file: {str(e)}")
                     st.error("Failed to create Excel report. Please try again.")
 
             with col2:
                 # PDF download
-                pdf_file = create_temp_file('.pdf')
                 try:
-                    pdf = FPDF()
-                    pdf.add_page()
-                    pdf.set_font("helvetica", "B", 14)
-                    pdf.cell(200, 10, "IGNOU Grade Report", new_x="LMARGIN", new_y="NEXT", align="C")
-                    pdf.ln(10)
-                    
-                    # Add student details section
-                    if student_details:
-                        pdf.set_font("helvetica", "B", 12)
-                        pdf.cell(200, 10, "Student Details", new_x="LMARGIN", new_y="NEXT")
-                        pdf.set_font("helvetica", size=12)
-                        pdf.cell(200, 10, f"Enrollment No: {student_details['enrollment']}", new_x="LMARGIN", new_y="NEXT")
-                        pdf.cell(200, 10, f"Name: {student_details['name']}", new_x="LMARGIN", new_y="NEXT")
-                        pdf.cell(200, 10, f"Programme Code: {student_details['program']}", new_x="LMARGIN", new_y="NEXT")
-                        pdf.ln(10)
-
-                    # Add summary section
-                    pdf.set_font("helvetica", "B", 12)
-                    pdf.cell(200, 10, "Summary", new_x="LMARGIN", new_y="NEXT")
-                    pdf.set_font("helvetica", size=12)
-                    pdf.cell(200, 10, f"Final Percentage: {percentage}%", new_x="LMARGIN", new_y="NEXT")
-                    pdf.cell(200, 10, f"Total Obtained Marks: {total_obtained_marks:.2f} / {total_possible_marks:.0f}", new_x="LMARGIN", new_y="NEXT")
-                    pdf.cell(200, 10, f"Total Assignment Marks: {totals['Asgn1']:.0f}", new_x="LMARGIN", new_y="NEXT")
-                    pdf.cell(200, 10, f"Total Theory Marks: {totals['TERM END THEORY']:.0f}", new_x="LMARGIN", new_y="NEXT")
-                    pdf.cell(200, 10, f"Total Practical Marks: {totals['TERM END PRACTICAL']:.0f}", new_x="LMARGIN", new_y="NEXT")
-                    pdf.ln(10)
-                    
-                    # Add completed subjects table
-                    pdf.set_font("helvetica", "B", 12)
-                    pdf.cell(200, 10, "Completed Subjects", new_x="LMARGIN", new_y="NEXT")
-                    pdf.set_font("helvetica", size=10)
-                    
-                    # Table headers with serial number
-                    headers = ["S.No.", "Course", "Assignment", "Theory", "Practical", "30% Assignment", "70% Theory", "Total"]
-                    col_widths = [10, 35, 20, 20, 20, 25, 25, 20]
-                    
-                    # Add headers
-                    for i, header in enumerate(headers):
-                        pdf.cell(col_widths[i], 10, header, 1)
-                    pdf.ln()
-                    
-                    # Add data rows with serial numbers
-                    for idx, (_, row) in enumerate(df_calc_display.iterrows(), 1):
-                        pdf.cell(col_widths[0], 10, str(idx), 1)
-                        pdf.cell(col_widths[1], 10, str(row["COURSE"]), 1)
-                        pdf.cell(col_widths[2], 10, f"{row['Asgn1']:.0f}", 1)
-                        pdf.cell(col_widths[3], 10, f"{row['TERM END THEORY']:.0f}", 1)
-                        pdf.cell(col_widths[4], 10, f"{row['TERM END PRACTICAL']:.0f}", 1)
-                        pdf.cell(col_widths[5], 10, f"{row['30% Assignments']:.2f}", 1)
-                        pdf.cell(col_widths[6], 10, f"{row['70% Theory']:.2f}", 1)
-                        pdf.cell(col_widths[7], 10, f"{row['Total (A+B)']:.2f}", 1)
-                        pdf.ln()
-                    
-                    # Add incomplete subjects if any
-                    if not df_incomplete.empty:
-                        pdf.ln(10)
-                        pdf.set_font("helvetica", "B", 12)
-                        pdf.cell(200, 10, "Incomplete Subjects", new_x="LMARGIN", new_y="NEXT")
-                        pdf.set_font("helvetica", size=10)
-                        
-                        # Table headers for incomplete subjects with serial number
-                        headers = ["S.No.", "Course", "Status", "Assignment", "Theory", "Practical"]
-                        col_widths = [10, 45, 25, 25, 25, 25]
-                        
-                        # Add headers
-                        for i, header in enumerate(headers):
-                            pdf.cell(col_widths[i], 10, header, 1)
-                        pdf.ln()
-                        
-                        # Add data rows with serial numbers
-                        for idx, (_, row) in enumerate(df_incomplete.iterrows(), 1):
-                            pdf.cell(col_widths[0], 10, str(idx), 1)
-                            pdf.cell(col_widths[1], 10, str(row["COURSE"]), 1)
-                            pdf.cell(col_widths[2], 10, str(row["STATUS"]), 1)
-                            pdf.cell(col_widths[3], 10, f"{row['Asgn1']:.0f}", 1)
-                            pdf.cell(col_widths[4], 10, f"{row['TERM END THEORY']:.0f}", 1)
-                            pdf.cell(col_widths[5], 10, f"{row['TERM END PRACTICAL']:.0f}", 1)
-                            pdf.ln()
-                    
-                    pdf.output(pdf_file)
-                    
-                    with open(pdf_file, 'rb') as f:
-                        st.download_button(
-                            "📄 Download PDF Report",
-                            f,
-                            file_name=f"ignou_grade_report_{st.session_state.session_id}.pdf",
-                            use_container_width=True
-                        )
+                    pdf_bytes = build_pdf_report(
+                        student_details, totals, percentage, total_possible_marks, df_calc_display, df_incomplete
+                    )
+                    st.download_button(
+                        "📄 Download PDF Report",
+                        pdf_bytes,
+                        file_name=f"ignou_grade_report_{st.session_state.session_id}.pdf",
+                        mime="application/pdf",
+                        use_container_width=True
+                    )
                 except Exception as e:
                     logging.error(f"Session {st.session_state.session_id} - Error creating PDF file: {str(e)}")
                     st.error("Failed to create PDF report. Please try again.")
 
-            # Completed subjects table with dynamic height
-            st.markdown('<div style="min-height: fit-content;">', unsafe_allow_html=True)
+            # Completed subjects table
             st.subheader("✅ Completed Subjects")
-            column_config = {
-                "COURSE": st.column_config.TextColumn(
-                    "Course",
-                    width="medium",
-                    help="Course Code"
-                ),
-                "Asgn1": st.column_config.NumberColumn(
-                    "Assignment",
-                    width="small",
-                    format="%.0f",
-                    help="Assignment Marks"
-                ),
-                "TERM END THEORY": st.column_config.NumberColumn(
-                    "Theory",
-                    width="small",
-                    format="%.0f",
-                    help="Theory Marks"
-                ),
-                "TERM END PRACTICAL": st.column_config.NumberColumn(
-                    "Practical",
-                    width="small",
-                    format="%.0f",
-                    help="Practical Marks"
-                ),
-                "30% Assignments": st.column_config.NumberColumn(
-                    "30% Assignment",
-                    width="small",
-                    format="%.2f",
-                    help="30% of Assignment Marks"
-                ),
-                "70% Theory": st.column_config.NumberColumn(
-                    "70% Theory/Practical",
-                    width="small",
-                    format="%.2f",
-                    help="70% of Theory/Practical Marks"
-                ),
-                "Total (A+B)": st.column_config.NumberColumn(
-                    "Total",
-                    width="small",
-                    format="%.2f",
-                    help="Total Marks"
-                )
-            }
 
+            # Marks are below 100 and shown to 2 decimals, so float32 halves the Arrow payload
             st.dataframe(
-                df_calc_display,
+                df_calc_display.astype({col: "float32" for col in SCORE_COLUMNS}),
                 use_container_width=True,
-                column_config=column_config,
+                column_config=COMPLETED_COLUMN_CONFIG,
                 hide_index=False
             )
-            st.markdown('</div>', unsafe_allow_html=True)
 
-            # Incomplete subjects table with dynamic height
-            df_incomplete = df[df["STATUS"] != "COMPLETED"]
+            # Incomplete subjects table
             if not df_incomplete.empty:
-                st.markdown('<div style="min-height: fit-content;">', unsafe_allow_html=True)
                 st.subheader("⚠️ Not Completed / Incomplete Subjects")
-                incomplete_config = {
-                    "COURSE": st.column_config.TextColumn(
-                        "Course",
-                        width="medium",
-                        help="Course Code"
-                    ),
-                    "STATUS": st.column_config.TextColumn(
-                        "Status",
-                        width="small",
-                        help="Course Status"
-                    ),
-                    "Asgn1": st.column_config.NumberColumn(
-                        "Assignment",
-                        width="small",
-                        format="%.0f",
-                        help="Assignment Marks"
-                    ),
-                    "TERM END THEORY": st.column_config.NumberColumn(
-                        "Theory",
-                        width="small",
-                        format="%.0f",
-                        help="Theory Marks"
-                    ),
-                    "TERM END PRACTICAL": st.column_config.NumberColumn(
-                        "Practical",
-                        width="small",
-                        format="%.0f",
-                        help="Practical Marks"
-                    )
-                }
+                # STATUS repeats a handful of values, so it goes over Arrow as a dictionary column
                 st.dataframe(
-                    df_incomplete,
+                    df_incomplete.astype({"STATUS": "category", **{col: "float32" for col in MARK_COLUMNS}}),
                     use_container_width=True,
-                    column_config=incomplete_config,
+                    column_config=INCOMPLETE_COLUMN_CONFIG,
                     hide_index=True
                 )
-                st.markdown('</div>', unsafe_allow_html=True)
-
-            # Clean up temporary files
-            try:
-                os.remove(excel_file)
-                os.remove(pdf_file)
-            except Exception as e:
-                logging.error(f"Session {st.session_state.session_id} - Error cleaning up temporary files: {str(e)}")
-
-            st.session_state.processing = False
-            break  # Successfully completed, exit the retry loop
-
-        except WebDriverException as e:
-            retry_count += 1
-            logging.error(f"Session {st.session_state.session_id} - Attempt {retry_count} failed due to WebDriver issue: {str(e)}")
-            if retry_count > max_retries:
-                st.error(f"⏳ Failed to initialize ChromeDriver after {max_retries + 1} attempts. Please try again later.")
-                try:
-                    result = subprocess.run(["chromium", "--version"], capture_output=True, text=True)
-                    logging.info(f"Session {st.session_state.session_id} - Chromium version check: {result.stdout or result.stderr}")
-                except Exception as debug_e:
-                    logging.error(f"Session {st.session_state.session_id} - Failed to check chromium version: {str(debug_e)}")
-                st.session_state.processing = False
-            else:
-                st.warning(f"⚠️ Attempt {retry_count} failed. Retrying in 3 seconds...")
-                time.sleep(3)
         except Exception as e:
             logging.error(f"Session {st.session_state.session_id} - Error: {str(e)}")
             st.error("❌ An error occurred. Please try again later.")
-            st.session_state.processing = False
-            break
-        finally:
-            if driver:
-                resource_manager.remove_driver(st.session_state.session_id)
-            st.session_state.processing = False
 
-# Update cleanup function to handle user data directories
-def cleanup_temp_files():
-    for file_path in st.session_state.temp_files:
+# Batch lookup for several enrollment numbers under the selected programme
+MAX_BATCH_SIZE = 10
+
+with st.expander("📋 Batch Lookup"):
+    batch_input = st.text_area(
+        "Enrollment Numbers",
+        placeholder="One enrollment number per line",
+        help="Fetch several grade cards at once using the programme selected above"
+    )
+    if st.button("🚀 Fetch All", disabled=st.session_state.processing or not batch_input.strip()):
+        batch_enrollments = list(dict.fromkeys(batch_input.replace(",", " ").split()))
+        invalid_enrollments = [e for e in batch_enrollments if not is_valid_enrollment(e)]
+        if invalid_enrollments:
+            st.error(f"❌ Enrollment numbers must be 9 or 10 digits: {', '.join(invalid_enrollments)}")
+            st.stop()
+        if len(batch_enrollments) > MAX_BATCH_SIZE:
+            st.error(f"❌ Please enter at most {MAX_BATCH_SIZE} enrollment numbers at a time.")
+            st.stop()
+        if not rate_limiter.check_rate_limit(len(batch_enrollments)):
+            fetch_limiter.throttle(60)
+            st.error(f"⚠️ Too many requests. Please wait {rate_limiter.retry_after(len(batch_enrollments)):.0f} seconds before trying again.")
+            st.stop()
+
+        st.session_state.processing = True
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logging.info(f"Cleaned up temporary file: {file_path}")
-        except Exception as e:
-            logging.error(f"Error cleaning up file {file_path}: {str(e)}")
-            try:
-                time.sleep(1)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as retry_e:
-                logging.error(f"Failed to remove file {file_path} after retry: {str(retry_e)}")
-    
-    # Cleanup Chrome user data directories
-    try:
-        for item in os.listdir("/tmp"):
-            if item.startswith("chrome_profile_"):
-                profile_path = os.path.join("/tmp", item)
-                if os.path.isdir(profile_path):
-                    shutil.rmtree(profile_path, ignore_errors=True)
-    except Exception as e:
-        logging.error(f"Error cleaning up Chrome profiles: {str(e)}")
+            logging.info(f"Session {st.session_state.session_id} - Starting batch fetch for {len(batch_enrollments)} enrollments")
+            with st.spinner("Fetching grade cards…"):
+                batch_results = fetch_gradecards(batch_enrollments, program_code, gradecard_for)
+        finally:
+            st.session_state.processing = False
 
-# Register cleanup functions
-atexit.register(cleanup_temp_files)
-atexit.register(resource_manager.cleanup_all)
\ No newline at end of file
+        batch_rows = []
+        for enrollment_number in batch_enrollments:
+            result = batch_results[enrollment_number]
+            row = {"Enrollment No": enrollment_number, "Name": "", "Completed Subjects": None, "Percentage": None, "Error": ""}
+            if isinstance(result, GradeCardError):
+                row["Error"] = str(result).removeprefix("❌ ")
+            elif isinstance(result, ServerBusyError):
+                row["Error"] = SERVER_BUSY_MESSAGE.removeprefix("⚠️ ")
+            elif isinstance(result, requests.RequestException):
+                if is_retryable(result):
+                    row["Error"] = "Could not reach the IGNOU grade card site"
+                else:
+                    row["Error"] = "The IGNOU grade card site rejected the request"
+            elif isinstance(result, Exception) or not {"COURSE", "STATUS"} <= set(result[1].columns):
+                logging.error(f"Session {st.session_state.session_id} - Batch error for {enrollment_number}: {result}")
+                row["Error"] = "Could not read the grade card"
+            else:
+                student_details, batch_df = result
+                try:
+                    batch_df["COURSE"] = batch_df["COURSE"].astype(str).fillna("")
+                    batch_calc, _, _, batch_percentage = calculate_scores(batch_df)
+                except Exception as e:
+                    logging.error(f"Session {st.session_state.session_id} - Batch scoring error for {enrollment_number}: {str(e)}")
+                    row["Error"] = "Could not read the grade card"
+                else:
+                    row["Name"] = student_details["name"] if student_details else ""
+                    row["Completed Subjects"] = len(batch_calc)
+                    row["Percentage"] = batch_percentage
+            batch_rows.append(row)
+
+        st.dataframe(
+            batch_rows,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Percentage": st.column_config.NumberColumn("Percentage", format="%.2f%%")
+            }
+        )
\ No newline at end of file